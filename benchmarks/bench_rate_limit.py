@@ -0,0 +1,86 @@
+"""Measure the per-request overhead of admission control.
+
+Times an ASGI round trip through a trivial app with and without
+AdmissionMiddleware, so the figure includes the middleware layer and not
+just the bucket arithmetic. When the API's dependencies are installed it
+also times the real client key function, which verifies the JWT.
+
+Usage: python benchmarks/bench_rate_limit.py [--iterations N]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from functools import partial
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rate_limit import AdmissionController, AdmissionMiddleware, MemoryBucketStore, SQLiteBucketStore
+
+# Generous limits so that every call takes the admit path, not the reject path
+UNLIMITED = {"read": (1e9, 1e9), "write": (1e9, 1e9), "auth": (1e9, 1e9)}
+
+
+async def ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def receive():
+    return {"type": "http.request", "body": b""}
+
+
+async def send(message):
+    pass
+
+
+def bench(app, iterations: int, query_strings: list) -> float:
+    scopes = [
+        {"type": "http", "method": "GET", "path": "/food/today", "query_string": query_string,
+         "client": ("10.0.0.1", 1234), "headers": []}
+        for query_string in query_strings
+    ]
+
+    async def run():
+        start = time.perf_counter()
+        for i in range(iterations):
+            await app(scopes[i % len(scopes)], receive, send)
+        return time.perf_counter() - start
+
+    return asyncio.run(run()) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200000)
+    args = parser.parse_args()
+
+    anonymous = [b""]
+    baseline = bench(ok_app, args.iterations, anonymous)
+    print(f"no middleware:     {baseline:.2f} us/request")
+
+    memory = AdmissionMiddleware(ok_app, AdmissionController(MemoryBucketStore(), limits=UNLIMITED))
+    print(f"memory store:      +{bench(memory, args.iterations, anonymous) - baseline:.2f} us/request")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteBucketStore(os.path.join(tmp, "rate_limits.db"))
+        sqlite = AdmissionMiddleware(ok_app, AdmissionController(store, limits=UNLIMITED))
+        print(f"sqlite store:      +{bench(sqlite, args.iterations // 10, anonymous) - baseline:.2f} us/request")
+
+    try:
+        from fitness_backend import Settings, create_access_token, rate_limit_key
+    except ImportError:
+        print("token key:         skipped (API dependencies not installed)")
+        return
+
+    settings = Settings()
+    tokens = [f"token={create_access_token({'sub': f'user-{i}'}, settings)}".encode() for i in range(1000)]
+    keyed = AdmissionMiddleware(ok_app, AdmissionController(MemoryBucketStore(), limits=UNLIMITED),
+                                client_key=partial(rate_limit_key, settings=settings))
+    print(f"memory + JWT key:  +{bench(keyed, args.iterations // 10, tokens) - baseline:.2f} us/request")
+
+
+if __name__ == "__main__":
+    main()
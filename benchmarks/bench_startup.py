@@ -0,0 +1,99 @@
+"""Measure cold-start cost: module import time and time to first response.
+
+Usage: python benchmarks/bench_startup.py [--runs N] [--baseline FILE] [--save-baseline FILE]
+
+With --baseline, exits non-zero when a metric regresses by more than
+--tolerance (a fraction of the baseline value).
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = (
+    "import time; start = time.perf_counter(); import fitness_backend; "
+    "print(time.perf_counter() - start)"
+)
+SERVER_SNIPPET = (
+    "import sys, uvicorn; "
+    "uvicorn.run('fitness_backend:app', host='127.0.0.1', port=int(sys.argv[1]), log_level='warning')"
+)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_import(env: dict) -> float:
+    output = subprocess.check_output([sys.executable, "-c", IMPORT_SNIPPET], cwd=ROOT, env=env)
+    return float(output)
+
+
+def measure_first_response(env: dict, timeout: float = 30.0) -> float:
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "-c", SERVER_SNIPPET, str(port)], cwd=ROOT, env=env)
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.005)
+        raise RuntimeError("server did not respond within the timeout")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--baseline", help="JSON file with previous results to compare against")
+    parser.add_argument("--save-baseline", help="write the results to this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # A fresh database each run so schema creation is part of time-to-first-response
+        results = {"import_seconds": [], "first_response_seconds": []}
+        for run in range(args.runs):
+            env = dict(os.environ, FITNESS_DB_PATH=os.path.join(tmp, f"bench_{run}.db"),
+                       RATE_LIMIT_DB=os.path.join(tmp, f"rate_limits_{run}.db"))
+            results["import_seconds"].append(measure_import(env))
+            results["first_response_seconds"].append(measure_first_response(env))
+
+    medians = {name: statistics.median(values) for name, values in results.items()}
+    for name, value in medians.items():
+        print(f"{name}: {value * 1000:.1f} ms")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(medians, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = [
+            name for name, value in medians.items()
+            if name in baseline and value > baseline[name] * (1 + args.tolerance)
+        ]
+        for name in regressions:
+            print(f"REGRESSION {name}: {medians[name] * 1000:.1f} ms vs baseline {baseline[name] * 1000:.1f} ms")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,33 +1,104 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import APIRouter, FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime, date
+from functools import lru_cache, partial
+import os
 import sqlite3
 import hashlib
-import jwt
-from passlib.context import CryptContext
-import uvicorn
-
-app = FastAPI(title="FitTracker Pro API", version="1.0.0")
+from urllib.parse import parse_qs
+from rate_limit import AdmissionController, AdmissionMiddleware, client_ip, make_store
+
+# passlib/bcrypt, jwt and uvicorn are imported on first use to keep import time low
+
+class Settings(BaseModel):
+    db_path: str = "fitness_app.db"
+    secret_key: str = "your-secret-key-change-in-production"
+    algorithm: str = "HS256"
+    rate_limit_backend: str = "memory"
+    rate_limit_db: str = "rate_limits.db"
+
+    @classmethod
+    def from_env(cls):
+        defaults = cls()
+        return cls(
+            db_path=os.environ.get("FITNESS_DB_PATH", defaults.db_path),
+            secret_key=os.environ.get("SECRET_KEY", defaults.secret_key),
+            rate_limit_backend=os.environ.get("RATE_LIMIT_BACKEND", defaults.rate_limit_backend),
+            rate_limit_db=os.environ.get("RATE_LIMIT_DB", defaults.rate_limit_db)
+        )
 
-# CORS middleware to allow frontend connections
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # In production, specify your frontend domain
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+router = APIRouter()
+
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
+    settings = settings or Settings.from_env()
+
+    app = FastAPI(title="FitTracker Pro API", version="1.0.0")
+    app.state.settings = settings
+
+    # Admission control: per-client token buckets plus per-route-class concurrency caps.
+    # Set RATE_LIMIT_BACKEND=sqlite to share buckets between worker processes.
+    # Registered before CORS so that CORS wraps it and 429s stay readable by browsers.
+    app.state.admission = AdmissionController(make_store(settings.rate_limit_backend, settings.rate_limit_db))
+    app.add_middleware(
+        AdmissionMiddleware,
+        controller=app.state.admission,
+        client_key=partial(rate_limit_key, settings=settings)
+    )
+
+    # CORS middleware to allow frontend connections
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # In production, specify your frontend domain
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    app.add_event_handler("startup", partial(init_db, settings))
+    app.include_router(router)
+    return app
+
+def __getattr__(name):
+    # Build the default app on first access so `uvicorn fitness_backend:app` keeps working
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def rate_limit_key(scope, name: str, settings: Settings) -> str:
+    # Authenticated calls are limited per user, everything else per client IP.
+    # Only verified tokens count, so made-up tokens cannot mint fresh buckets.
+    if name != "auth":
+        token = parse_qs(scope["query_string"].decode("latin-1")).get("token")
+        username = verify_token(token[0], settings) if token else None
+        if username:
+            return f"user:{username}"
+    return f"ip:{client_ip(scope)}"
+
+def get_settings(request: Request) -> Settings:
+    return request.app.state.settings
 
 # Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-SECRET_KEY = "your-secret-key-change-in-production"
-ALGORITHM = "HS256"
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # Database setup
-def init_db():
-    conn = sqlite3.connect('fitness_app.db')
+# Bump whenever init_db() changes the schema
+SCHEMA_VERSION = 1
+
+def init_db(settings: Settings):
+    conn = sqlite3.connect(settings.db_path)
+
+    # Skip the CREATE statements when the stored schema is already current
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+        conn.close()
+        return
+
     cursor = conn.cursor()
 
     # Users table
@@ -112,6 +183,33 @@ def init_db():
         )
     """)
 
+    # Change log table (one row per write, drives /sync)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_change_log_user_seq ON change_log (user_id, seq)
+    """)
+
+    # Backfill rows written before the change log existed so /sync?since=0 returns full history
+    for table_name in SYNC_TABLES:
+        cursor.execute(f"""
+            INSERT INTO change_log (user_id, table_name, row_id)
+            SELECT user_id, ?, id FROM {table_name}
+            WHERE user_id IS NOT NULL
+              AND id NOT IN (SELECT row_id FROM change_log WHERE table_name = ?)
+            ORDER BY id
+        """, (table_name, table_name))
+
+    cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
     conn.commit()
     conn.close()
 
@@ -156,23 +254,32 @@ class StepsLog(BaseModel):
     steps: int
 
 # Database helper functions
-def get_db_connection():
-    conn = sqlite3.connect('fitness_app.db')
+def get_db_connection(settings: Settings):
+    conn = sqlite3.connect(settings.db_path)
     conn.row_factory = sqlite3.Row
     return conn
 
-def get_user_by_username(username: str):
-    conn = get_db_connection()
+def get_user_by_username(username: str, settings: Settings):
+    conn = get_db_connection(settings)
     user = conn.execute('SELECT * FROM users WHERE username = ?', (username,)).fetchone()
     conn.close()
     return user
 
-def create_access_token(data: dict):
-    return jwt.encode(data, SECRET_KEY, algorithm=ALGORITHM)
+def record_change(conn, user_id: int, table_name: str, row_id: int):
+    """Append a write to the change log; must run inside the caller's transaction."""
+    conn.execute("""
+        INSERT INTO change_log (user_id, table_name, row_id)
+        VALUES (?, ?, ?)
+    """, (user_id, table_name, row_id))
+
+def create_access_token(data: dict, settings: Settings):
+    import jwt
+    return jwt.encode(data, settings.secret_key, algorithm=settings.algorithm)
 
-def verify_token(token: str):
+def verify_token(token: str, settings: Settings):
+    import jwt
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
         return payload.get("sub")
     except jwt.PyJWTError:
         return None
@@ -205,19 +312,26 @@ EXERCISE_DATABASE = {
     "tennis": {"calories_per_minute": 7, "intensity_multiplier": {"low": 0.8, "moderate": 1.0, "high": 1.3}}
 }
 
-# API Routes
+# Columns returned per table by /sync (user_id is implied by the token)
+SYNC_TABLES = {
+    "food_logs": ["id", "food_name", "calories", "quantity", "unit", "meal_type", "logged_at"],
+    "exercise_logs": ["id", "exercise_name", "duration", "intensity", "calories_burned", "logged_at"],
+    "weight_logs": ["id", "weight", "unit", "logged_at"],
+    "water_logs": ["id", "glasses", "logged_date"],
+    "steps_logs": ["id", "steps", "logged_date"]
+}
+SYNC_PAGE_SIZE = 500
+SYNC_MAX_PAGE_SIZE = 1000
 
-@app.on_event("startup")
-async def startup_event():
-    init_db()
+# API Routes
 
-@app.get("/")
+@router.get("/")
 async def root():
     return {"message": "FitTracker Pro API is running!"}
 
-@app.post("/register")
-async def register(user: UserCreate):
-    conn = get_db_connection()
+@router.post("/register")
+async def register(user: UserCreate, settings: Settings = Depends(get_settings)):
+    conn = get_db_connection(settings)
 
     # Check if user exists
     existing_user = conn.execute('SELECT id FROM users WHERE username = ? OR email = ?', 
@@ -227,7 +341,7 @@ async def register(user: UserCreate):
         raise HTTPException(status_code=400, detail="Username or email already registered")
 
     # Hash password and create user
-    password_hash = pwd_context.hash(user.password)
+    password_hash = get_pwd_context().hash(user.password)
 
     cursor = conn.execute("""
         INSERT INTO users (username, email, password_hash, name, weight, height, age, gender, body_type, goal)
@@ -240,27 +354,27 @@ async def register(user: UserCreate):
     conn.close()
 
     # Create access token
-    access_token = create_access_token(data={"sub": user.username})
+    access_token = create_access_token({"sub": user.username}, settings)
 
     return {"access_token": access_token, "token_type": "bearer", "user_id": user_id}
 
-@app.post("/login")
-async def login(user: UserLogin):
-    db_user = get_user_by_username(user.username)
+@router.post("/login")
+async def login(user: UserLogin, settings: Settings = Depends(get_settings)):
+    db_user = get_user_by_username(user.username, settings)
 
-    if not db_user or not pwd_context.verify(user.password, db_user['password_hash']):
+    if not db_user or not get_pwd_context().verify(user.password, db_user['password_hash']):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
-    access_token = create_access_token(data={"sub": user.username})
+    access_token = create_access_token({"sub": user.username}, settings)
     return {"access_token": access_token, "token_type": "bearer", "user_id": db_user['id']}
 
-@app.get("/user/profile")
-async def get_profile(token: str):
-    username = verify_token(token)
+@router.get("/user/profile")
+async def get_profile(token: str, settings: Settings = Depends(get_settings)):
+    username = verify_token(token, settings)
     if not username:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    user = get_user_by_username(username)
+    user = get_user_by_username(username, settings)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
@@ -278,26 +392,27 @@ async def get_profile(token: str):
         "daily_calorie_goal": user['daily_calorie_goal']
     }
 
-@app.post("/food/log")
-async def log_food(food: FoodLog, token: str):
-    username = verify_token(token)
+@router.post("/food/log")
+async def log_food(food: FoodLog, token: str, settings: Settings = Depends(get_settings)):
+    username = verify_token(token, settings)
     if not username:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    user = get_user_by_username(username)
-    conn = get_db_connection()
+    user = get_user_by_username(username, settings)
+    conn = get_db_connection(settings)
 
-    conn.execute("""
+    cursor = conn.execute("""
         INSERT INTO food_logs (user_id, food_name, calories, quantity, unit, meal_type)
         VALUES (?, ?, ?, ?, ?, ?)
     """, (user['id'], food.food_name, food.calories, food.quantity, food.unit, food.meal_type))
+    record_change(conn, user['id'], 'food_logs', cursor.lastrowid)
 
     conn.commit()
     conn.close()
 
     return {"message": "Food logged successfully"}
 
-@app.get("/food/search/{food_name}")
+@router.get("/food/search/{food_name}")
 async def search_food(food_name: str):
     food_name_lower = food_name.lower()
 
@@ -331,14 +446,14 @@ async def search_food(food_name: str):
 
     return {"results": results}
 
-@app.get("/food/today")
-async def get_today_food(token: str):
-    username = verify_token(token)
+@router.get("/food/today")
+async def get_today_food(token: str, settings: Settings = Depends(get_settings)):
+    username = verify_token(token, settings)
     if not username:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    user = get_user_by_username(username)
-    conn = get_db_connection()
+    user = get_user_by_username(username, settings)
+    conn = get_db_connection(settings)
 
     today = date.today()
     foods = conn.execute("""
@@ -367,26 +482,27 @@ async def get_today_food(token: str):
 
     return {"foods": food_list, "total_calories": total_calories}
 
-@app.post("/exercise/log")
-async def log_exercise(exercise: ExerciseLog, token: str):
-    username = verify_token(token)
+@router.post("/exercise/log")
+async def log_exercise(exercise: ExerciseLog, token: str, settings: Settings = Depends(get_settings)):
+    username = verify_token(token, settings)
     if not username:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    user = get_user_by_username(username)
-    conn = get_db_connection()
+    user = get_user_by_username(username, settings)
+    conn = get_db_connection(settings)
 
-    conn.execute("""
+    cursor = conn.execute("""
         INSERT INTO exercise_logs (user_id, exercise_name, duration, intensity, calories_burned)
         VALUES (?, ?, ?, ?, ?)
     """, (user['id'], exercise.exercise_name, exercise.duration, exercise.intensity, exercise.calories_burned))
+    record_change(conn, user['id'], 'exercise_logs', cursor.lastrowid)
 
     conn.commit()
     conn.close()
 
     return {"message": "Exercise logged successfully"}
 
-@app.get("/exercise/calculate")
+@router.get("/exercise/calculate")
 async def calculate_exercise_calories(exercise_name: str, duration: int, intensity: str):
     exercise_name_lower = exercise_name.lower()
 
@@ -404,14 +520,14 @@ async def calculate_exercise_calories(exercise_name: str, duration: int, intensi
 
     return {"calories_burned": calories_burned}
 
-@app.get("/exercise/today")
-async def get_today_exercise(token: str):
-    username = verify_token(token)
+@router.get("/exercise/today")
+async def get_today_exercise(token: str, settings: Settings = Depends(get_settings)):
+    username = verify_token(token, settings)
     if not username:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    user = get_user_by_username(username)
-    conn = get_db_connection()
+    user = get_user_by_username(username, settings)
+    conn = get_db_connection(settings)
 
     today = date.today()
     exercises = conn.execute("""
@@ -439,37 +555,38 @@ async def get_today_exercise(token: str):
 
     return {"exercises": exercise_list, "total_calories_burned": total_calories_burned}
 
-@app.post("/weight/log")
-async def log_weight(weight: WeightLog, token: str):
-    username = verify_token(token)
+@router.post("/weight/log")
+async def log_weight(weight: WeightLog, token: str, settings: Settings = Depends(get_settings)):
+    username = verify_token(token, settings)
     if not username:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    user = get_user_by_username(username)
-    conn = get_db_connection()
+    user = get_user_by_username(username, settings)
+    conn = get_db_connection(settings)
 
     # Update user's current weight
     conn.execute('UPDATE users SET weight = ? WHERE id = ?', (weight.weight, user['id']))
 
     # Log weight entry
-    conn.execute("""
+    cursor = conn.execute("""
         INSERT INTO weight_logs (user_id, weight, unit)
         VALUES (?, ?, ?)
     """, (user['id'], weight.weight, weight.unit))
+    record_change(conn, user['id'], 'weight_logs', cursor.lastrowid)
 
     conn.commit()
     conn.close()
 
     return {"message": "Weight logged successfully"}
 
-@app.get("/weight/history")
-async def get_weight_history(token: str, days: int = 30):
-    username = verify_token(token)
+@router.get("/weight/history")
+async def get_weight_history(token: str, days: int = 30, settings: Settings = Depends(get_settings)):
+    username = verify_token(token, settings)
     if not username:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    user = get_user_by_username(username)
-    conn = get_db_connection()
+    user = get_user_by_username(username, settings)
+    conn = get_db_connection(settings)
 
     weights = conn.execute("""
         SELECT weight, unit, logged_at FROM weight_logs 
@@ -490,14 +607,14 @@ async def get_weight_history(token: str, days: int = 30):
 
     return {"weight_history": weight_history}
 
-@app.post("/water/log")
-async def log_water(water: WaterLog, token: str):
-    username = verify_token(token)
+@router.post("/water/log")
+async def log_water(water: WaterLog, token: str, settings: Settings = Depends(get_settings)):
+    username = verify_token(token, settings)
     if not username:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    user = get_user_by_username(username)
-    conn = get_db_connection()
+    user = get_user_by_username(username, settings)
+    conn = get_db_connection(settings)
 
     today = date.today()
 
@@ -511,26 +628,30 @@ async def log_water(water: WaterLog, token: str):
         conn.execute("""
             UPDATE water_logs SET glasses = ? WHERE user_id = ? AND logged_date = ?
         """, (water.glasses, user['id'], today))
+        row_id = existing['id']
     else:
         # Create new entry
-        conn.execute("""
+        cursor = conn.execute("""
             INSERT INTO water_logs (user_id, glasses, logged_date)
             VALUES (?, ?, ?)
         """, (user['id'], water.glasses, today))
+        row_id = cursor.lastrowid
+
+    record_change(conn, user['id'], 'water_logs', row_id)
 
     conn.commit()
     conn.close()
 
     return {"message": "Water intake logged successfully"}
 
-@app.get("/water/today")
-async def get_today_water(token: str):
-    username = verify_token(token)
+@router.get("/water/today")
+async def get_today_water(token: str, settings: Settings = Depends(get_settings)):
+    username = verify_token(token, settings)
     if not username:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    user = get_user_by_username(username)
-    conn = get_db_connection()
+    user = get_user_by_username(username, settings)
+    conn = get_db_connection(settings)
 
     today = date.today()
     water_log = conn.execute("""
@@ -542,14 +663,14 @@ async def get_today_water(token: str):
     glasses = water_log['glasses'] if water_log else 0
     return {"glasses": glasses, "goal": 8}
 
-@app.post("/steps/log")
-async def log_steps(steps: StepsLog, token: str):
-    username = verify_token(token)
+@router.post("/steps/log")
+async def log_steps(steps: StepsLog, token: str, settings: Settings = Depends(get_settings)):
+    username = verify_token(token, settings)
     if not username:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    user = get_user_by_username(username)
-    conn = get_db_connection()
+    user = get_user_by_username(username, settings)
+    conn = get_db_connection(settings)
 
     today = date.today()
 
@@ -563,26 +684,30 @@ async def log_steps(steps: StepsLog, token: str):
         conn.execute("""
             UPDATE steps_logs SET steps = ? WHERE user_id = ? AND logged_date = ?
         """, (steps.steps, user['id'], today))
+        row_id = existing['id']
     else:
         # Create new entry
-        conn.execute("""
+        cursor = conn.execute("""
             INSERT INTO steps_logs (user_id, steps, logged_date)
             VALUES (?, ?, ?)
         """, (user['id'], steps.steps, today))
+        row_id = cursor.lastrowid
+
+    record_change(conn, user['id'], 'steps_logs', row_id)
 
     conn.commit()
     conn.close()
 
     return {"message": "Steps logged successfully"}
 
-@app.get("/steps/today")
-async def get_today_steps(token: str):
-    username = verify_token(token)
+@router.get("/steps/today")
+async def get_today_steps(token: str, settings: Settings = Depends(get_settings)):
+    username = verify_token(token, settings)
     if not username:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    user = get_user_by_username(username)
-    conn = get_db_connection()
+    user = get_user_by_username(username, settings)
+    conn = get_db_connection(settings)
 
     today = date.today()
     steps_log = conn.execute("""
@@ -594,14 +719,65 @@ async def get_today_steps(token: str):
     steps = steps_log['steps'] if steps_log else 0
     return {"steps": steps, "goal": 10000}
 
-@app.get("/dashboard/summary")
-async def get_dashboard_summary(token: str):
-    username = verify_token(token)
+@router.get("/sync")
+async def sync_changes(token: str, since: int = 0, limit: int = SYNC_PAGE_SIZE, settings: Settings = Depends(get_settings)):
+    username = verify_token(token, settings)
+    if not username:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    if since < 0:
+        raise HTTPException(status_code=400, detail="Cursor must be non-negative")
+
+    user = get_user_by_username(username, settings)
+    conn = get_db_connection(settings)
+    limit = max(1, min(limit, SYNC_MAX_PAGE_SIZE))
+
+    # Collapse repeated edits of the same row to its latest change
+    changes = conn.execute("""
+        SELECT table_name, row_id, MAX(seq) AS seq FROM change_log
+        WHERE user_id = ? AND seq > ?
+        GROUP BY table_name, row_id
+        ORDER BY seq
+        LIMIT ?
+    """, (user['id'], since, limit + 1)).fetchall()
+
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    row_ids = {}
+    for change in changes:
+        if change['table_name'] in SYNC_TABLES:
+            row_ids.setdefault(change['table_name'], []).append(change['row_id'])
+
+    # Compact encoding: one column header per table, rows as positional arrays
+    result = {}
+    for table_name, ids in row_ids.items():
+        columns = SYNC_TABLES[table_name]
+        placeholders = ",".join("?" * len(ids))
+        rows = conn.execute(f"""
+            SELECT {", ".join(columns)} FROM {table_name}
+            WHERE user_id = ? AND id IN ({placeholders})
+        """, (user['id'], *ids)).fetchall()
+
+        found = {row['id'] for row in rows}
+        result[table_name] = {
+            "columns": columns,
+            "rows": [list(row) for row in rows],
+            "deleted": [row_id for row_id in ids if row_id not in found]
+        }
+
+    conn.close()
+
+    cursor = changes[-1]['seq'] if changes else since
+    return {"cursor": cursor, "has_more": has_more, "changes": result}
+
+@router.get("/dashboard/summary")
+async def get_dashboard_summary(token: str, settings: Settings = Depends(get_settings)):
+    username = verify_token(token, settings)
     if not username:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    user = get_user_by_username(username)
-    conn = get_db_connection()
+    user = get_user_by_username(username, settings)
+    conn = get_db_connection(settings)
 
     today = date.today()
 
@@ -648,13 +824,13 @@ async def get_dashboard_summary(token: str):
         "progress_percentage": min(100, (net_calories / calorie_goal) * 100) if calorie_goal > 0 else 0
     }
 
-@app.get("/recommendations")
-async def get_recommendations(token: str):
-    username = verify_token(token)
+@router.get("/recommendations")
+async def get_recommendations(token: str, settings: Settings = Depends(get_settings)):
+    username = verify_token(token, settings)
     if not username:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    user = get_user_by_username(username)
+    user = get_user_by_username(username, settings)
 
     # Generate recommendations based on user's body type and goal
     body_type = user['body_type'] or 'mesomorph'
@@ -715,4 +891,5 @@ async def get_recommendations(token: str):
     return recommendations
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    import uvicorn
+    uvicorn.run(create_app(), host="0.0.0.0", port=8000)
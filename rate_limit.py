@@ -0,0 +1,249 @@
+"""Admission control for the FitTracker Pro API.
+
+Token buckets bound how much work a single client can ask for, and a
+per-route-class concurrency limiter bounds how much work the process takes
+on at once. Both reject immediately instead of queueing, so an overloaded
+worker answers 429 in microseconds rather than piling up requests.
+"""
+import asyncio
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# (bucket capacity, refill rate in tokens per second) per route class
+DEFAULT_LIMITS = {
+    "read": (60, 10.0),
+    "write": (30, 2.0),
+    "auth": (5, 0.2)    # bcrypt hashing/verification is the expensive path
+}
+
+# Maximum in-flight requests per route class, per worker process
+DEFAULT_CONCURRENCY = {
+    "read": 64,
+    "write": 32,
+    "auth": 4
+}
+
+AUTH_PATHS = {"/login", "/register"}
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+# Buckets untouched for this long have refilled under every default limit
+IDLE_SECONDS = 60
+
+
+def route_class(method: str, path: str) -> str:
+    if path in AUTH_PATHS:
+        return "auth"
+    if method in WRITE_METHODS:
+        return "write"
+    return "read"
+
+
+def client_ip(scope) -> str:
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def _refill(tokens: float, updated: float, capacity: float, rate: float, now: float):
+    """Return (tokens after refill and one take, seconds to wait or 0)."""
+    tokens = min(capacity, tokens + (now - updated) * rate)
+    if tokens >= 1:
+        return tokens - 1, 0.0
+    return tokens, (1 - tokens) / rate
+
+
+class MemoryBucketStore:
+    """Token buckets held in this process; limits are per worker.
+
+    At most max_keys buckets are kept. The least recently used one is
+    dropped to make room, which at worst hands an idle client a full bucket.
+    """
+
+    blocking = False
+
+    def __init__(self, max_keys: int = 100000):
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self._max_keys = max_keys
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def take(self, key: str, capacity: float, rate: float) -> float:
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self._max_keys:
+                    self._buckets.popitem(last=False)
+                bucket = self._buckets[key] = [capacity, now]
+            else:
+                self._buckets.move_to_end(key)
+
+            bucket[0], wait = _refill(bucket[0], bucket[1], capacity, rate, now)
+            bucket[1] = now
+            return wait
+
+
+class SQLiteBucketStore:
+    """Token buckets shared by every worker process using the same database file.
+
+    Calls block on the database lock, so the middleware runs them in a thread.
+    """
+
+    blocking = True
+
+    def __init__(self, path: str = "rate_limits.db", timeout: float = 0.1, prune_interval: float = 60.0):
+        self._path = path
+        self._timeout = timeout
+        self._prune_interval = prune_interval
+        self._last_prune = time.time()
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS rate_buckets (
+                key TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated REAL NOT NULL
+            )
+        """)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, timeout=self._timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+        return conn
+
+    def take(self, key: str, capacity: float, rate: float) -> float:
+        conn = self._connection()
+        # Wall-clock time so that separate processes agree on elapsed time
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM rate_buckets WHERE key = ?", (key,)).fetchone()
+            tokens, updated = row if row else (capacity, now)
+            tokens, wait = _refill(tokens, updated, capacity, rate, now)
+            conn.execute("""
+                INSERT OR REPLACE INTO rate_buckets (key, tokens, updated)
+                VALUES (?, ?, ?)
+            """, (key, tokens, now))
+            if now - self._last_prune >= self._prune_interval:
+                self._last_prune = now
+                conn.execute("DELETE FROM rate_buckets WHERE updated < ?", (now - IDLE_SECONDS,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+
+class ConcurrencyLimiter:
+    """Counts in-flight requests per route class and refuses past the limit."""
+
+    def __init__(self, limits: dict):
+        self._limits = dict(limits)
+        self._in_flight = {name: 0 for name in limits}
+        self._lock = threading.Lock()
+
+    def in_flight(self, name: str) -> int:
+        return self._in_flight[name]
+
+    def try_acquire(self, name: str) -> bool:
+        with self._lock:
+            if self._in_flight[name] >= self._limits[name]:
+                return False
+            self._in_flight[name] += 1
+            return True
+
+    def release(self, name: str):
+        with self._lock:
+            self._in_flight[name] -= 1
+
+
+class AdmissionController:
+    def __init__(self, store=None, limits: dict = None, concurrency: dict = None):
+        self.store = store if store is not None else MemoryBucketStore()
+        self.limits = limits or DEFAULT_LIMITS
+        self.concurrency = ConcurrencyLimiter(concurrency or DEFAULT_CONCURRENCY)
+
+    def admit(self, name: str, client_key: str) -> float:
+        """Admit a request, returning 0, or the seconds the client should wait.
+
+        Every admitted request must be paired with a call to release().
+        """
+        capacity, rate = self.limits[name]
+        try:
+            wait = self.store.take(f"{name}:{client_key}", capacity, rate)
+        except sqlite3.Error:
+            # A busy or broken shared store must not take the API down with it
+            wait = 0.0
+        if wait:
+            return wait
+        if not self.concurrency.try_acquire(name):
+            return 1.0
+        return 0.0
+
+    def release(self, name: str):
+        self.concurrency.release(name)
+
+
+class AdmissionMiddleware:
+    """ASGI middleware that runs every HTTP request through an AdmissionController.
+
+    client_key(scope, route_class) names the bucket a request draws from and
+    defaults to the client IP.
+    """
+
+    def __init__(self, app, controller: AdmissionController, client_key=None):
+        self.app = app
+        self.controller = controller
+        self.client_key = client_key or (lambda scope, name: client_ip(scope))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        name = route_class(scope["method"], scope["path"])
+        key = self.client_key(scope, name)
+        if self.controller.store.blocking:
+            loop = asyncio.get_running_loop()
+            retry_after = await loop.run_in_executor(None, self.controller.admit, name, key)
+        else:
+            retry_after = self.controller.admit(name, key)
+
+        if retry_after:
+            await _reject(send, retry_after)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(name)
+
+
+async def _reject(send, retry_after: float):
+    body = b'{"detail":"Too many requests"}'
+    await send({
+        "type": "http.response.start",
+        "status": 429,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(math.ceil(retry_after)).encode())
+        ]
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def make_store(backend: str = "memory", path: str = "rate_limits.db"):
+    if backend == "memory":
+        return MemoryBucketStore()
+    if backend == "sqlite":
+        return SQLiteBucketStore(path)
+    raise ValueError(f"Unknown rate limit backend: {backend}")
@@ -0,0 +1,62 @@
+import os
+import sqlite3
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("jwt")
+
+from fastapi.testclient import TestClient
+
+import fitness_backend
+from fitness_backend import Settings, create_access_token, create_app
+
+
+def add_user(db_path, username):
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO users (username, email, password_hash, name) VALUES (?, ?, 'h', ?)",
+                 (username, f"{username}@example.com", username))
+    conn.commit()
+    conn.close()
+
+
+def test_apps_keep_their_own_settings(tmp_path):
+    settings_a = Settings(db_path=str(tmp_path / "a.db"), secret_key="A")
+    settings_b = Settings(db_path=str(tmp_path / "b.db"), secret_key="B")
+    app_a = create_app(settings_a)
+    app_b = create_app(settings_b)
+
+    with TestClient(app_a) as client_a, TestClient(app_b) as client_b:
+        assert os.path.exists(settings_a.db_path)
+        assert os.path.exists(settings_b.db_path)
+        add_user(settings_a.db_path, "alice")
+        add_user(settings_b.db_path, "bob")
+
+        token_a = create_access_token({"sub": "alice"}, settings_a)
+        token_b = create_access_token({"sub": "bob"}, settings_b)
+
+        assert client_a.get("/user/profile", params={"token": token_a}).json()["username"] == "alice"
+        assert client_b.get("/user/profile", params={"token": token_b}).json()["username"] == "bob"
+        assert client_a.get("/user/profile", params={"token": token_b}).status_code == 401
+
+        # Building the default app afterwards must not affect apps already created
+        fitness_backend.app
+        assert client_a.get("/user/profile", params={"token": token_a}).status_code == 200
+
+
+def test_init_db_skips_current_schema(tmp_path):
+    settings = Settings(db_path=str(tmp_path / "fitness.db"))
+    fitness_backend.init_db(settings)
+
+    conn = sqlite3.connect(settings.db_path)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == fitness_backend.SCHEMA_VERSION
+    conn.execute("DROP TABLE steps_logs")
+    conn.commit()
+    conn.close()
+
+    # A current schema version short-circuits the CREATE statements
+    fitness_backend.init_db(settings)
+    conn = sqlite3.connect(settings.db_path)
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    conn.close()
+    assert "steps_logs" not in tables
@@ -0,0 +1,101 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from rate_limit import AdmissionController, AdmissionMiddleware, MemoryBucketStore, SQLiteBucketStore
+
+
+def call(app, method="GET", path="/food/today", client=("10.0.0.1", 1234)):
+    """Run one HTTP request through an ASGI app and return the response start message."""
+    scope = {"type": "http", "method": method, "path": path, "query_string": b"", "client": client, "headers": []}
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return messages[0]
+
+
+async def ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+def test_rejects_with_retry_after_once_bucket_is_empty():
+    controller = AdmissionController(limits={"read": (2, 0.5), "write": (1, 1), "auth": (1, 1)})
+    app = AdmissionMiddleware(ok_app, controller)
+
+    assert call(app)["status"] == 200
+    assert call(app)["status"] == 200
+    rejected = call(app)
+    assert rejected["status"] == 429
+    assert dict(rejected["headers"])[b"retry-after"] == b"2"
+
+    # Another client has its own bucket
+    assert call(app, client=("10.0.0.2", 1234))["status"] == 200
+
+
+def test_slot_is_released_when_handler_raises():
+    controller = AdmissionController(concurrency={"read": 1, "write": 1, "auth": 1})
+
+    async def failing_app(scope, receive, send):
+        raise RuntimeError("boom")
+
+    app = AdmissionMiddleware(failing_app, controller)
+    with pytest.raises(RuntimeError):
+        call(app)
+    assert controller.concurrency.in_flight("read") == 0
+    assert call(AdmissionMiddleware(ok_app, controller))["status"] == 200
+
+
+def test_memory_store_is_capped():
+    store = MemoryBucketStore(max_keys=100)
+    for i in range(1000):
+        store.take(f"client-{i}", 10, 1.0)
+    assert len(store) == 100
+
+
+def test_locked_sqlite_store_fails_open(tmp_path):
+    path = str(tmp_path / "rate_limits.db")
+    controller = AdmissionController(SQLiteBucketStore(path, timeout=0.01))
+
+    blocker = sqlite3.connect(path, isolation_level=None)
+    blocker.execute("BEGIN EXCLUSIVE")
+    try:
+        assert call(AdmissionMiddleware(ok_app, controller))["status"] == 200
+    finally:
+        blocker.execute("ROLLBACK")
+        blocker.close()
+    assert controller.concurrency.in_flight("read") == 0
+
+
+def test_sqlite_store_prunes_idle_buckets(tmp_path):
+    path = str(tmp_path / "rate_limits.db")
+    store = SQLiteBucketStore(path, prune_interval=0)
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO rate_buckets (key, tokens, updated) VALUES ('stale', 1, 0)")
+    conn.commit()
+
+    store.take("fresh", 10, 1.0)
+    keys = [row[0] for row in conn.execute("SELECT key FROM rate_buckets")]
+    conn.close()
+    assert keys == ["fresh"]
+
+
+def test_unverified_tokens_share_the_client_ip_bucket(tmp_path):
+    pytest.importorskip("fastapi")
+    pytest.importorskip("jwt")
+    from fastapi.testclient import TestClient
+
+    from fitness_backend import Settings, create_app
+
+    app = create_app(Settings(db_path=str(tmp_path / "fitness.db")))
+    with TestClient(app) as client:
+        statuses = [client.get("/food/today", params={"token": f"junk{i}"}).status_code for i in range(80)]
+    assert 429 in statuses
+    assert len(app.state.admission.store) == 1
@@ -0,0 +1,42 @@
+import sqlite3
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("jwt")
+
+from fastapi.testclient import TestClient
+
+import fitness_backend
+
+
+def test_sync_backfills_rows_written_before_change_log(tmp_path):
+    db_path = str(tmp_path / "fitness.db")
+
+    # A database from before the change log: log tables with history, no change_log
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT UNIQUE NOT NULL, "
+                 "email TEXT UNIQUE NOT NULL, password_hash TEXT NOT NULL, name TEXT NOT NULL, "
+                 "weight REAL, daily_calorie_goal INTEGER DEFAULT 2000)")
+    conn.execute("CREATE TABLE food_logs (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, "
+                 "food_name TEXT NOT NULL, calories INTEGER NOT NULL, quantity REAL NOT NULL, unit TEXT NOT NULL, "
+                 "meal_type TEXT NOT NULL, logged_at TIMESTAMP DEFAULT '2024-01-01 08:00:00')")
+    conn.execute("INSERT INTO users (username, email, password_hash, name) VALUES ('ann', 'a@x', 'h', 'Ann')")
+    conn.executemany("INSERT INTO food_logs (user_id, food_name, calories, quantity, unit, meal_type) "
+                     "VALUES (1, ?, 100, 1, 'g', 'lunch')", [("rice",), ("egg",)])
+    conn.commit()
+    conn.close()
+
+    app = fitness_backend.create_app(fitness_backend.Settings(db_path=db_path, secret_key="test"))
+    with TestClient(app) as client:
+        token = fitness_backend.create_access_token({"sub": "ann"}, app.state.settings)
+        client.post("/water/log", params={"token": token}, json={"glasses": 3})
+
+        first = client.get("/sync", params={"token": token, "since": 0, "limit": 2}).json()
+        assert first["has_more"] is True
+        assert [row[1] for row in first["changes"]["food_logs"]["rows"]] == ["rice", "egg"]
+
+        second = client.get("/sync", params={"token": token, "since": first["cursor"]}).json()
+        assert second["has_more"] is False
+        assert second["changes"]["water_logs"]["rows"][0][1] == 3
+        assert "food_logs" not in second["changes"]